@@ -3,9 +3,83 @@ import re
 import json
 import argparse
 
-from typing import List
+from json.encoder import encode_basestring
+from typing import Dict, Iterable, Iterator, List
 from tqdm import tqdm
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Названия ключей записи в порядке вывода итоговой информации
+_KEYS = ('email',
+         'weight',
+         'inn',
+         'passport_series',
+         'occupation',
+         'age',
+         'academic_degree',
+         'worldview',
+         'address')
+
+# Шаблоны полей записи без якорей, общие для проверок по полям и _RE_FUSED
+_EMAIL_PATTERN = '[^\\s@]+@(?:[^\\s@.,]+\\.)+[^\\s@.,]{2,}'
+_ADDRESS_PATTERN = '[\\wа-яА-Я\\s\\.\\d-]* \\d+'
+_TEXT_PATTERN = '[a-zA-Zа-яА-Я -]+'
+
+_RE_EMAIL = re.compile('^%s$' % _EMAIL_PATTERN).match
+_RE_ADDRESS = re.compile('^%s$' % _ADDRESS_PATTERN).match
+_RE_TEXT = re.compile('^%s$' % _TEXT_PATTERN).match
+
+# Все строковые поля записи, склеенные через '\0', проверяются одним
+# вызовом; при несовпадении запись разбирается по полям. В отрицательные
+# классы добавляется '\0', чтобы поле не захватывало разделитель.
+# Шаблоны ИНН и серии паспорта повторяют check_inn и check_passport.
+_RE_FUSED = re.compile('\\x00'.join((
+    '^' + _EMAIL_PATTERN.replace('[^', '[^\\x00'),
+    '\\d{12}',
+    '\\d{2} \\d{2}',
+    _TEXT_PATTERN,
+    _TEXT_PATTERN,
+    _TEXT_PATTERN,
+    _ADDRESS_PATTERN + '\\Z',
+))).match
+
+
+def _is_int_literal(value: str) -> bool:
+    '''
+      Проверяет, что строка записана как целое число в формате int()
+
+      Допускаются пробелы по краям, знак числа и одиночные '_' между
+      цифрами. Ограничение int() на количество цифр не проверяется.
+
+      Parameters
+      ----------
+        value : str
+          Проверяемая строка
+
+      Returns
+      -------
+        bool:
+          Булевый результат проверки
+    '''
+
+    digits = value.strip()
+
+    if digits[:1] in ('+', '-'):
+        digits = digits[1:]
+
+    return (digits.replace('_', '').isdecimal()
+            and not digits.startswith('_')
+            and not digits.endswith('_')
+            and '__' not in digits)
+
 
 class Entry:
     '''
@@ -32,6 +106,10 @@ class Entry:
       address : str
         адрес пользователя
     '''
+    __slots__ = ('curdict', 'email', 'weight', 'inn', 'passport_series',
+                 'occupation', 'age', 'academic_degree', 'worldview',
+                 'address')
+
     email: str
     weight: str
     inn: str
@@ -67,40 +145,72 @@ class Validator:
     ----------
       entries : List[Entry]
         Список записей
+      errors_count : Dict[str, int]
+        Количество ошибок по названиям ключей, найденных parse
+        и parse_stream
     '''
 
     entries: List[Entry]
+    errors_count: Dict[str, int]
 
     def __init__(self, entries: List[Entry]):
-        self.entries = []
-
-        for i in entries:
-            self.entries.append(Entry(i))
-
-        #self.entries = entries
+        self.entries = [Entry(i) for i in entries]
+        self.errors_count = dict.fromkeys(_KEYS, 0)
 
-    def parse(self) -> (List[List[str]], List[Entry]):
+    def parse(self) -> (Dict[str, int], List[Entry]):
         '''
         Выполняет проверку корректности записей
 
+        Ошибки по названиям ключей подсчитываются заново
+        в errors_count.
+
         Returns
         -------
-          (List[List[str]], List[Entry]):
-            Пара: cписок списков неверных записей по названиям ключей
+          (Dict[str, int], List[Entry]):
+            Пара: количество ошибок по названиям ключей
 						и список верных записей
         '''
 
-        illegal_entries = []
+        self.errors_count = errors_count = dict.fromkeys(_KEYS, 0)
         legal_entries = []
 
         for i in self.entries:
             illkeys = self.parse_entry(i)
 
             if len(illkeys) != 0:
-                illegal_entries.append(illkeys)
+                for key in illkeys:
+                    errors_count[key] += 1
             else:
                 legal_entries.append(i)
-        return (illegal_entries, legal_entries)
+        return (errors_count, legal_entries)
+
+    def parse_stream(self, entries: Iterable[dict]) -> Iterator[Entry]:
+        '''
+        Выполняет проверку корректности записей по мере их чтения
+
+        Ошибки по названиям ключей подсчитываются
+        в errors_count.
+
+        Parameters
+        ----------
+          entries : Iterable[dict]
+            Записи в порядке чтения из файла
+
+        Returns
+        -------
+          Iterator[Entry]:
+            Верные записи
+        '''
+
+        for dic in entries:
+            entry = Entry(dic)
+            illkeys = self.parse_entry(entry)
+
+            if len(illkeys) != 0:
+                for key in illkeys:
+                    self.errors_count[key] += 1
+            else:
+                yield entry
 
     def parse_entry(self, entry: Entry) -> List[str]:
         '''
@@ -114,28 +224,27 @@ class Validator:
 
         illegal_keys = []
 
-        if not self.check_email(entry.email):
-            illegal_keys.append('email')
-        elif not self.check_inn(entry.inn):
-            illegal_keys.append('inn')
-        elif not self.check_passport(entry.passport_series):
-            illegal_keys.append('passport_series')
-        elif not self.check_weight(entry.weight):
-            illegal_keys.append('weight')
-        elif not self.check_age(entry.age):
-            illegal_keys.append('age')
-        elif not self.check_address(entry.address):
-            illegal_keys.append('address')
-        elif not self.check_occupation(entry.occupation):
-            illegal_keys.append('occupation')
-        elif not self.check_degree(entry.academic_degree):
-            illegal_keys.append('academic_degree')
-        elif not self.check_worldview(entry.worldview):
-            illegal_keys.append('worldview')
+        if (self.check_weight(entry.weight) and self.check_age(entry.age)
+                and _RE_FUSED('\0'.join((entry.email,
+                                         entry.inn,
+                                         entry.passport_series,
+                                         entry.occupation,
+                                         entry.academic_degree,
+                                         entry.worldview,
+                                         entry.address))) is not None):
+            return illegal_keys
+
+        dic = entry.curdict
+
+        for key, check in _CHECKS:
+            if not check(dic[key]):
+                illegal_keys.append(key)
+                break
 
         return illegal_keys
 
-    def check_email(self, email: str) -> bool:
+    @staticmethod
+    def check_email(email: str) -> bool:
         '''
         Выполняет проверку корректности адреса электронной почты.
 
@@ -152,12 +261,10 @@ class Validator:
           bool:
             Булевый результат проверки на корректность
         '''
-        pattern = "^[^\\s@]+@([^\\s@.,]+\\.)+[^\\s@.,]{2,}$"
-        if re.match(pattern, email):
-            return True
-        return False
+        return '@' in email and _RE_EMAIL(email) is not None
 
-    def check_inn(self, inn: str) -> bool:
+    @staticmethod
+    def check_inn(inn: str) -> bool:
         '''
         Выполняет проверку корректности ИНН.
 
@@ -174,13 +281,10 @@ class Validator:
             Булевый результат проверки на корректность
         '''
 
-        pattern = '^\\d{12}$'
-
-        if re.match(pattern, inn):
-            return True
-        return False
+        return len(inn) == 12 and inn.isdecimal()
 
-    def check_passport(self, passport: str) -> bool:
+    @staticmethod
+    def check_passport(passport: str) -> bool:
         '''
         Выполняет проверку корректности серии паспорта.
 
@@ -197,13 +301,11 @@ class Validator:
             Булевый результат проверки на корректность
         '''
 
-        pattern = '^\\d{2} \\d{2}$'
+        return (len(passport) == 5 and passport[2] == ' '
+                and passport.replace(' ', '', 1).isdecimal())
 
-        if re.match(pattern, passport):
-            return True
-        return False
-
-    def check_weight(self, weight: str) -> bool:
+    @staticmethod
+    def check_weight(weight: str) -> bool:
         '''
         Выполняет проверку корректности веса пользователя.
 
@@ -220,14 +322,18 @@ class Validator:
             Булевый результат проверки на корректность
         '''
 
+        if isinstance(weight, str) and not _is_int_literal(weight):
+            return False
+
         try:
-            iweight = int(weight)
+            weight = int(weight)
         except ValueError:
             return False
 
-        return iweight > 25 and iweight < 300
+        return 25 < weight < 300
 
-    def check_age(self, age: str) -> bool:
+    @staticmethod
+    def check_age(age: str) -> bool:
         '''
         Выполняет проверку корректности возраста пользователя.
 
@@ -244,12 +350,15 @@ class Validator:
             Булевый результат проверки на корректность
         '''
 
+        if isinstance(age, str) and not _is_int_literal(age):
+            return False
+
         try:
-            iage = int(age)
+            age = int(age)
         except ValueError:
             return False
 
-        return iage >= 18 and iage < 110
+        return 18 <= age < 110
 
     def check_address(self, address: str) -> bool:
         '''
@@ -269,11 +378,7 @@ class Validator:
             Булевый результат проверки на корректность
         '''
 
-        pattern = '^[\\wа-яА-Я\\s\\.\\d-]* \\d+$'
-
-        if re.match(pattern, address):
-            return True
-        return False
+        return _RE_ADDRESS(address) is not None
 
     def check_occupation(self, occupation: str) -> bool:
         '''
@@ -292,11 +397,7 @@ class Validator:
             Булевый результат проверки на корректность
         '''
 
-        pattern = '^[a-zA-Zа-яА-Я -]+$'
-
-        if re.match(pattern, occupation):
-            return True
-        return False
+        return _RE_TEXT(occupation) is not None
 
     def check_degree(self, degree: str) -> bool:
         '''
@@ -315,11 +416,7 @@ class Validator:
             Булевый результат проверки на корректность
         '''
 
-        pattern = '^[a-zA-Zа-яА-Я -]+$'
-
-        if re.match(pattern, degree):
-            return True
-        return False
+        return _RE_TEXT(degree) is not None
 
     def check_worldview(self, worldview: str) -> bool:
         '''
@@ -338,40 +435,102 @@ class Validator:
             Булевый результат проверки на корректность
         '''
 
-        pattern = '^[a-zA-Zа-яА-Я -]+$'
+        return _RE_TEXT(worldview) is not None
+
+
+# Проверки полей записи в порядке, в котором parse_entry ищет ошибку:
+# сначала дешёвые, затем регулярные выражения
+_CHECKS = (
+    ('weight', Validator.check_weight),
+    ('age', Validator.check_age),
+    ('inn', Validator.check_inn),
+    ('passport_series', Validator.check_passport),
+    ('occupation', _RE_TEXT),
+    ('academic_degree', _RE_TEXT),
+    ('worldview', _RE_TEXT),
+    ('email', Validator.check_email),
+    ('address', _RE_ADDRESS),
+)
 
-        if re.match(pattern, worldview):
-            return True
-        return False
 
+def load_json(filename: str) -> List[dict]:
+    '''
+      Загружает записи из json-файла в кодировке windows-1251
+
+      Если установлен orjson, разбор выполняется с его помощью;
+      файлы, которые orjson отвергает, разбираются модулем json.
+
+      Parameters
+      ----------
+        filename : str
+          Имя файла с записями
+
+      Returns
+      -------
+        List[dict]:
+          Список записей
+    '''
+
+    with open(filename, encoding='windows-1251') as file:
+        text = file.read()
+
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+
+    return json.loads(text)
+
+
+class _Utf8Reader:
+    '''
+    Перекодирует текстовый файл в байты UTF-8 для ijson
+    '''
+
+    def __init__(self, file):
+        self.file = file
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size).encode('utf-8')
+
+
+def iter_json(filename: str) -> Iterator[dict]:
+    '''
+      Последовательно читает записи из json-файла в кодировке windows-1251
 
-def show_summary(result: List[List[str]], filename: str = ''):
+      Если установлен ijson, файл целиком в память не загружается.
+
+      Parameters
+      ----------
+        filename : str
+          Имя файла с записями
+
+      Returns
+      -------
+        Iterator[dict]:
+          Записи в порядке следования в файле
+    '''
+
+    if ijson is None:
+        yield from load_json(filename)
+        return
+
+    with open(filename, encoding='windows-1251') as file:
+        yield from ijson.items(_Utf8Reader(file), 'item')
+
+
+def show_summary(errors_count: Dict[str, int], filename: str = ''):
     '''
       Выдаёт итоговую информацию об ошибках в записях
 
       Parameters
       ----------
-        result : List[List[str]]
-          Список списков неверных записей по названиям ключей
+        errors_count : Dict[str, int]
+          Количество ошибок по названиям ключей
     '''
 
-    all_errors_count = 0
-    errors_count = {
-        "email": 0,
-        "weight": 0,
-        "inn": 0,
-        "passport_series": 0,
-        "occupation": 0,
-        "age": 0,
-        "academic_degree": 0,
-        "worldview": 0,
-        "address": 0,
-    }
-
-    for i in result:
-        for j in i:
-            errors_count[j] += 1
-            all_errors_count += 1
+    all_errors_count = sum(errors_count.values())
 
     if filename == '':
         print('\nВсего ошибок: %d\n' % all_errors_count)
@@ -386,74 +545,88 @@ def show_summary(result: List[List[str]], filename: str = ''):
             for key, value in errors_count.items():
                 file.write(key + ': ' + str(value) + '\n')
 
-def save_in_json(data: List[Entry], filename: str):
+def save_in_json(data: Iterable[Entry], filename: str):
   '''
       Выдаёт итоговую информацию о верных записях в формате json
 
       Parameters
       ----------
-        data : List[Entry]
-          Список верных записей
+        data : Iterable[Entry]
+          Верные записи
         filename : str
           Имя файла для записи
   '''
-  f = open(filename, 'w')
-
-  f.write('[')
-
-  for i in data:
-    f.write('''
+  records = ('''
     {
-      "email": "%s",
+      "email": %s,
       "weight": %d,
-      "inn": "%s",
-      "passport_series": "%s",
-      "occupation": "%s",
+      "inn": %s,
+      "passport_series": %s,
+      "occupation": %s,
       "age": %d,
-      "academic_degree": "%s",
-      "worldview": "%s",
-      "address": "%s",
-    },''' % (i.email,
-    i.weight,
-    i.inn,
-    i.passport_series,
-    i.occupation,
-    i.age,
-    i.academic_degree,
-    i.worldview,
-    i.address))
-  f.write('\n]')
-  f.close()
-
-
-if len(sys.argv) < 2:
-  input_file = '21.txt'
-  output_file = '21_result.txt'
-else:
-  parser = argparse.ArgumentParser(
-      description='Make users\' entries validation.')
-  parser.add_argument('-input_file', metavar='input_file', nargs=1, type=str,
-                      help='input file name')
-  parser.add_argument('-output_file', metavar='output_file', nargs=1, type=str,
-                      help='output file name')
-
-  args = parser.parse_args()
-
-  input_file = args.input_file[0]
-  output_file = args.output_file[0]
-
-
-val = Validator([])
-
-with tqdm(total=100) as progressbar:
-    data = json.load(open(input_file, encoding='windows-1251'))
-    progressbar.update(60)
-
-    val = Validator(data)
-    res = val.parse()
-
-    progressbar.update(40)
-
-    show_summary(res[0], output_file)
-    save_in_json(res[1], 'valid_data.txt')
+      "academic_degree": %s,
+      "worldview": %s,
+      "address": %s
+    }''' % (encode_basestring(i.email),
+    int(i.weight),
+    encode_basestring(i.inn),
+    encode_basestring(i.passport_series),
+    encode_basestring(i.occupation),
+    int(i.age),
+    encode_basestring(i.academic_degree),
+    encode_basestring(i.worldview),
+    encode_basestring(i.address)) for i in data)
+
+  with open(filename, 'w', buffering=1 << 20, encoding='utf-8') as f:
+    f.write('[')
+
+    first = next(records, None)
+
+    if first is not None:
+      f.write(first)
+      f.writelines(',' + record for record in records)
+
+    f.write('\n]')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        input_file = '21.txt'
+        output_file = '21_result.txt'
+        stream = False
+    else:
+        parser = argparse.ArgumentParser(
+            description='Make users\' entries validation.')
+        parser.add_argument('-input_file', metavar='input_file', nargs=1, type=str,
+                            help='input file name')
+        parser.add_argument('-output_file', metavar='output_file', nargs=1, type=str,
+                            help='output file name')
+        parser.add_argument('-stream', action='store_true',
+                            help='validate entries while reading the input file')
+
+        args = parser.parse_args()
+
+        input_file = args.input_file[0]
+        output_file = args.output_file[0]
+        stream = args.stream
+
+    val = Validator([])
+
+    with tqdm(total=100) as progressbar:
+        if stream:
+            save_in_json(val.parse_stream(iter_json(input_file)), 'valid_data.txt')
+            progressbar.update(100)
+
+            show_summary(val.errors_count, output_file)
+        else:
+            data = load_json(input_file)
+            progressbar.update(60)
+
+            val = Validator(data)
+            res = val.parse()
+
+            progressbar.update(40)
+
+            show_summary(res[0], output_file)
+            save_in_json(res[1], 'valid_data.txt')
 